@@ -2,9 +2,10 @@ import os
 import sys
 import time
 import logging
+import concurrent.futures
 import webbrowser
+from requests.adapters import HTTPAdapter
 from arcgis.gis import GIS
-from arcgis.features import FeatureLayerCollection
 
 # Configuration settings for connecting to the ArcGIS Portal and for service publishing
 PORTAL_URL = "https://gis.czu.cz/portal"
@@ -29,25 +30,44 @@ CONFIG = {
 if not os.path.exists("logs_reports"):
 	os.makedirs("logs_reports")
 
+# Mount a larger connection pool on the ArcGIS API's internal session for the burst of REST calls below.
+def enlarge_connection_pool(gis):
+	"""
+	Mounts a larger connection pool on the session the ArcGIS API uses internally,
+	so bursts of REST calls reuse connections instead of discarding and reopening them.
+	"""
+	session = getattr(gis._con, "_session", None)
+	if session is None:
+		return
+	adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=2)
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+
+# Setup logging: timestamped records go to the log file, plain messages to the console.
+_file_handler = logging.FileHandler(CONFIG["log_file"], encoding="utf-8")
+_file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_file_handler, _console_handler])
+
 # Connect to the ArcGIS Portal using the provided URL and token.
 try:
 	gis = GIS(PORTAL_URL, token=TOKEN)
-	print(f"✅ Connected to ArcGIS Portal as {gis.users.me.username}")
+	enlarge_connection_pool(gis)
+	# Resolve the signed-in user once; every later query reuses the cached username.
+	ME = gis.users.me
+	USERNAME = ME.username
+	# Owner filter shared by every content query.
+	OWNER_CLAUSE = f' AND owner:{USERNAME}'
+	logging.info("✅ Connected to ArcGIS Portal as %s", USERNAME)
 except Exception as e:
-	print(f"❌ Failed to connect: {e}")
+	logging.error("❌ Failed to connect: %s", e)
 	sys.exit()
 
-# Setup logging to record events and errors in a log file.
-logging.basicConfig(
-	filename=CONFIG["log_file"],
-	level=logging.INFO,
-	format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
 # Delete any existing feature service that exactly matches the given service name.
 def delete_existing_service(service_name):
 	# Build a query to search for the service by title and owner.
-	query = f'title:"{service_name}" AND owner:{gis.users.me.username}'
+	query = f'title:"{service_name}"' + OWNER_CLAUSE
 	# Perform the search for Feature Services.
 	search_results = gis.content.search(query=query, item_type="Feature Service", max_items=10)
 	if search_results:
@@ -55,11 +75,9 @@ def delete_existing_service(service_name):
 		for item in search_results:
 			try:
 				item.delete()
-				print(f"🗑️ Deleted existing service: {item.title}")
-				logging.info(f"Deleted existing service: {item.title}")
+				logging.info("🗑️ Deleted existing service: %s", item.title)
 			except Exception as e:
-				print(f"❌ Error deleting service {item.title}: {e}")
-				logging.error(f"Error deleting service {item.title}: {e}")
+				logging.error("❌ Error deleting service %s: %s", item.title, e)
 				return False
 	return True
 
@@ -70,14 +88,17 @@ def wait_for_service_deletion(service_name, timeout=180):
 	Returns True if deletion is confirmed within the timeout period, otherwise returns False.
 	"""
 	start_time = time.time()
-	query = f'title:"{service_name}" AND owner:{gis.users.me.username}'
+	# Only existence matters here, so ask the portal for a count instead of full item metadata.
+	query = f'title:"{service_name}"' + OWNER_CLAUSE + ' AND type:"Feature Service"'
+	# Poll with exponential backoff (0.5 s growing to at most 5 s) so quick deletions are noticed quickly.
+	delay = 0.5
 	# Continuously check until the service is deleted or the timeout expires.
 	while time.time() - start_time < timeout:
-		search_results = gis.content.search(query=query, item_type="Feature Service", max_items=1)
-		if not search_results:
+		if gis.content.advanced_search(query=query, return_count=True) == 0:
 			return True
-		print(f"Waiting for service '{service_name}' to be fully deleted...")
-		time.sleep(5)
+		logging.info("Waiting for service '%s' to be fully deleted...", service_name)
+		time.sleep(delay)
+		delay = min(delay * 1.5, 5.0)
 	return False
 
 # Search for items of a given file type owned by the current user.
@@ -86,13 +107,9 @@ def get_portal_files(file_types=["Shapefile"]):
 	Searches portal content for items of the specified types owned by the current user.
 	Returns a list of matching items.
 	"""
-	items = []
-	username = gis.users.me.username
-	# Loop through each specified file type.
-	for ftype in file_types:
-		results = gis.content.search(query=f'type:"{ftype}" AND owner:{username}', max_items=100)
-		items.extend(results)
-	return items
+	# Combine all requested types into one disjunctive query so the portal is searched only once.
+	types_clause = "(" + " OR ".join(f'type:"{ftype}"' for ftype in file_types) + ")"
+	return gis.content.search(query=types_clause + OWNER_CLAUSE, max_items=100 * len(file_types))
 
 # Function: interactive_selection
 # Purpose: Let the user select which items to publish from a displayed list.
@@ -127,41 +144,107 @@ def get_user_metadata():
 	"""
 	return CONFIG.get("metadata", {"description": "", "tags": "", "categories": ""})
 
+# Fragments of a publish error that mean a service with the same name already exists.
+CONFLICT_MARKERS = ("already exists", "00071")
+
+# Function: publish_item
+# Purpose: Publish an item under the given service name, raising if the portal rejects it.
+def publish_item(item, service_name):
+	"""
+	Publishes the provided item as a feature service and returns the published item.
+	"""
+	logging.info("✅ Uploading %s...", item.title)
+	published_item = item.publish(publish_parameters={'name': service_name})
+	if published_item is None:
+		raise Exception("Publishing returned None")
+	logging.info("✅ Published Feature Service: %s", published_item.title)
+	return published_item
+
 # Function: publish_feature_service
-# Purpose: Publish an item as a feature service, update its metadata, and return the published item.
-def publish_feature_service(item, service_name, metadata):
+# Purpose: Publish an item as a feature service, replacing an existing service of the same name if needed.
+def publish_feature_service(item, service_name):
 	"""
 	Publishes the provided item as a feature service with the given service name.
-	Updates metadata after publishing.
+	Publishing is attempted straight away; only if the portal reports a name conflict is the
+	existing service deleted and the item published again.
 	Returns the published item or None if publishing fails.
 	"""
 	try:
-		logging.info(f"Attempting to publish item: {item.title}")
-		print(f"✅ Uploading {item.title}...")
-		# Publish the item with the provided service name.
-		published_item = item.publish(publish_parameters={'name': service_name})
-		if published_item is None:
-			raise Exception("Publishing returned None")
-		print(f"✅ Published Feature Service: {published_item.title}")
-		logging.info(f"Published Feature Service: {published_item.title}")
-		# Update the service metadata: tags, description, and categories.
-		published_item.update({
+		return publish_item(item, service_name)
+	except Exception as e:
+		if not any(marker in str(e).lower() for marker in CONFLICT_MARKERS):
+			logging.error("❌ Failed to publish service: %s", e)
+			return None
+
+	logging.warning("⚠️ Service '%s' already exists. Deleting it and republishing...", service_name)
+	if not delete_existing_service(service_name):
+		logging.error("❌ Could not delete existing service '%s'.", service_name)
+		return None
+	if not wait_for_service_deletion(service_name):
+		logging.error("❌ Timeout waiting for deletion of '%s'.", service_name)
+		return None
+	try:
+		return publish_item(item, service_name)
+	except Exception as e:
+		logging.error("❌ Failed to publish service: %s", e)
+		return None
+
+# Function: update_service_metadata
+# Purpose: Update the tags, description, and categories of a published service.
+def update_service_metadata(fs, metadata):
+	"""
+	Updates the item metadata of the published service.
+	"""
+	try:
+		fs.update({
 			"tags": metadata.get("tags", ""),
 			"description": metadata.get("description", ""),
 			"categories": metadata.get("categories", "")
 		})
-		print(f"✅ Updated metadata for {published_item.title}")
-		logging.info(f"Updated metadata for {published_item.title}")
-		return published_item
+		logging.info("✅ Updated metadata for %s", fs.title)
 	except Exception as e:
-		logging.error(f"Failed to publish service: {e}")
-		print(f"❌ Failed to publish service: {e}")
-		return None
+		logging.error("❌ Failed to update metadata for %s: %s", fs.title, e)
+
+# Function: update_service_properties
+# Purpose: Update the feature layer properties of a published service.
+def update_service_properties(fs):
+	"""
+	Enables querying, editing, and extraction on the published service and raises its record limit.
+	"""
+	from arcgis.features import FeatureLayerCollection
+	try:
+		layers = FeatureLayerCollection(fs.url, gis)
+		layers.manager.update_definition({
+			"capabilities": "Query, Editing, Extract",
+			"maxRecordCount": 5000,
+			"allowGeometryUpdates": True
+		})
+		logging.info("✅ Service properties updated for %s", fs.title)
+	except Exception as e:
+		logging.error("❌ Failed to update service properties for %s: %s", fs.title, e)
+
+# Function: share_service
+# Purpose: Set sharing permissions based on the default share level in the configuration.
+def share_service(fs):
+	"""
+	Shares the published service publicly, with the organization, or not at all.
+	"""
+	share_level = CONFIG.get("default_share_level", "org")
+	try:
+		if share_level == "public":
+			fs.share(everyone=True, org=False)
+		elif share_level == "org":
+			fs.share(everyone=False, org=True)
+		else:
+			fs.share(everyone=False, org=False)
+		logging.info("✅ Permissions set to %s for %s", share_level, fs.title)
+	except Exception as e:
+		logging.error("❌ Failed to set permissions for %s: %s", fs.title, e)
 
 # Retrieve portal items of type "Shapefile" (excluding File Geodatabases)
 discovered_items = get_portal_files(file_types=["Shapefile"])
 if not discovered_items:
-	print("No matching items found in your portal content.")
+	logging.warning("No matching items found in your portal content.")
 	sys.exit()
 
 # Let the user select which discovered items should be published
@@ -177,87 +260,43 @@ single_publish = (len(selected_items) == 1)
 # Process each selected item for publishing
 for itm in selected_items:
 	# Determine the service name and metadata based on whether there is only one selected item.
+	base_name = os.path.splitext(itm.title)[0]
 	if single_publish:
-		service_name = CONFIG["arcgis"].get("service_name", os.path.splitext(itm.title)[0])
+		service_name = CONFIG["arcgis"].get("service_name", base_name)
 		metadata = get_user_metadata()
 	else:
-		service_name = os.path.splitext(itm.title)[0]
+		service_name = base_name
 		metadata = {}
 
-	# Check if a service with the same name already exists and delete it if found.
-	existing = gis.content.search(
-		query=f'title:"{service_name}" AND owner:{gis.users.me.username}', item_type="Feature Service", max_items=1
-	)
-	if existing:
-		print(f"⚠️ Service '{service_name}' already exists. Deleting it automatically...")
-		if delete_existing_service(service_name):
-			if not wait_for_service_deletion(service_name):
-				print(f"❌ Timeout waiting for deletion of '{service_name}'. Skipping this item.")
-				continue
-		else:
-			print(f"❌ Could not delete existing service '{service_name}'. Skipping this item.")
-			continue
+	# Publish the selected item as a feature service; an existing service with the same name is replaced.
+	fs = publish_feature_service(itm, service_name)
 
-	# Publish the selected item as a feature service.
-	fs = publish_feature_service(itm, service_name, metadata)
-	if fs is None:
-		# If a conflict occurs, attempt deletion and republishing.
-		print(f"⚠️ Conflict detected for '{service_name}'. Attempting to delete and republish...")
-		if delete_existing_service(service_name):
-			if wait_for_service_deletion(service_name):
-				fs = publish_feature_service(itm, service_name, metadata)
-			else:
-				print(f"❌ Timeout waiting for deletion of '{service_name}'. Skipping this item.")
-				continue
-		else:
-			print(f"❌ Could not delete existing service '{service_name}'. Skipping this item.")
-			continue
-
-	# If publishing was successful, update the service's properties and sharing permissions.
+	# If publishing was successful, update the service's metadata, properties, and sharing permissions.
+	# The three updates hit independent REST endpoints, so they run concurrently.
 	if fs:
-		try:
-			# Update the feature layer properties of the published service.
-			layers = FeatureLayerCollection(fs.url, gis)
-			layers.manager.update_definition({
-				"capabilities": "Query, Editing, Extract",
-				"maxRecordCount": 5000,
-				"allowGeometryUpdates": True
-			})
-			print(f"✅ Service properties updated for {fs.title}")
-			logging.info(f"Service properties updated for {fs.title}")
-		except Exception as e:
-			print(f"❌ Failed to update service properties: {e}")
-			logging.error(f"Failed to update service properties for {fs.title}: {e}")
-
-		# Set sharing permissions based on the default share level in the configuration.
-		share_level = CONFIG.get("default_share_level", "org")
-		try:
-			if share_level == "public":
-				fs.share(everyone=True, org=False)
-			elif share_level == "org":
-				fs.share(everyone=False, org=True)
-			else:
-				fs.share(everyone=False, org=False)
-			print(f"✅ Permissions set to {share_level} for {fs.title}")
-			logging.info(f"Permissions set to {share_level} for {fs.title}")
-		except Exception as e:
-			print(f"❌ Failed to set permissions: {e}")
-			logging.error(f"Failed to set permissions for {fs.title}: {e}")
+		with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+			futures = [
+				executor.submit(update_service_metadata, fs, metadata),
+				executor.submit(update_service_properties, fs),
+				executor.submit(share_service, fs)
+			]
+			for future in futures:
+				future.result()
 
 		published_services.append(fs)
 	else:
-		print(f"❌ Failed to publish {service_name}")
+		logging.error("❌ Failed to publish %s", service_name)
 
-# Offer the user an option to preview each published service in the ArcGIS Online Map Viewer.
-for service in published_services:
-	preview_choice = input(f"Do you want to preview the map for {service.title}? (y/n): ").strip().lower()
+# Ask once whether to preview all published services in the ArcGIS Online Map Viewer.
+if published_services:
+	preview_choice = input("Preview all published maps? (y/n): ").strip().lower()
 	if preview_choice == "y":
-		try:
-			map_viewer_url = f"https://www.arcgis.com/apps/mapviewer/index.html?url={service.url}&source=sd"
-			webbrowser.open(map_viewer_url)
-			print(f"🔍 Opening map preview: {map_viewer_url}")
-		except Exception as e:
-			print(f"❌ Failed to open map preview: {e}")
-			logging.error(f"Failed to open map preview for {service.title}: {e}")
+		for service in published_services:
+			try:
+				map_viewer_url = f"https://www.arcgis.com/apps/mapviewer/index.html?url={service.url}&source=sd"
+				webbrowser.open_new_tab(map_viewer_url)
+				logging.info("🔍 Opening map preview: %s", map_viewer_url)
+			except Exception as e:
+				logging.error("❌ Failed to open map preview for %s: %s", service.title, e)
 
-print("🚀 Publishing process completed.")
+logging.info("🚀 Publishing process completed.")
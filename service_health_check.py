@@ -1,13 +1,14 @@
 import requests
 import logging
-import smtplib
+import sys
 import time
 import datetime
 import os
-from email.message import EmailMessage
-from arcgis.gis import GIS
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+import mmap
+import shelve
+import threading
+import concurrent.futures
+from requests.adapters import HTTPAdapter
 
 # Create the "logs_reports" folder if it doesn't exist
 if not os.path.exists("logs_reports"):
@@ -24,6 +25,9 @@ CONFIG = {
 		{"url": "https://gis.czu.cz/serverhs/rest/info/healthcheck", "type": "healthcheck"}
 	],
 	"log_file": "logs_reports/arcgis_health_log.txt",
+	# Successful website checks are reused across runs for this many seconds
+	"check_cache_file": "logs_reports/.hc_cache",
+	"check_cache_ttl": 30,
 	"smtp": {
 		"server": "smtp.gmail.com",
 		"port": 587,
@@ -33,13 +37,54 @@ CONFIG = {
 	},
 	"arcgis": {
 		"url": "https://gis.czu.cz/portal",
-		"shapefile": "PID"
+		"shapefile": "PID",
+		# Token refreshed by the portal is reused by later runs until it is this many seconds old
+		"token_cache_file": "logs_reports/.gis_token",
+		"token_ttl": 3600
 	}
 }
 
-# Setup logging to file with INFO level and a specific format
-logging.basicConfig(filename=CONFIG["log_file"], level=logging.INFO,
-	format='%(asctime)s - %(levelname)s - %(message)s')
+# Setup logging with INFO level: timestamped records go to the log file, plain messages to the console
+_file_handler = logging.FileHandler(CONFIG["log_file"], encoding="utf-8")
+_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[_file_handler, _console_handler])
+
+# Shared HTTP session so that checks against the same host reuse pooled keep-alive connections
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Serializes access to the on-disk check cache, since checks run on several threads
+_check_cache_lock = threading.Lock()
+
+
+def get_cached_check(url):
+	"""
+	Returns the stored result of a recent successful check for the URL, or None if there is no fresh entry.
+	"""
+	try:
+		with _check_cache_lock, shelve.open(CONFIG["check_cache_file"]) as cache:
+			cached = cache.get(url)
+	except Exception as e:
+		logging.warning("Could not read website check cache: %s", e)
+		return None
+	if cached and time.time() - cached["ts"] < CONFIG["check_cache_ttl"]:
+		return cached["result"]
+	return None
+
+
+def store_cached_check(url, result):
+	"""
+	Stores a successful check result for the URL so that runs shortly afterwards can skip the probe.
+	"""
+	try:
+		with _check_cache_lock, shelve.open(CONFIG["check_cache_file"]) as cache:
+			cache[url] = {"ts": time.time(), "result": result}
+	except Exception as e:
+		logging.warning("Could not write website check cache: %s", e)
 
 
 def check_website(url, type_):
@@ -47,11 +92,23 @@ def check_website(url, type_):
 	Checks if a website endpoint is accessible.
 	Tracks the response time and checks the response content for the healthcheck endpoint.
 	Returns a dictionary with the URL, type, status, response time, and any error encountered.
+	Successful results are cached on disk for a short time; failures are always re-probed.
 	"""
+	cached = get_cached_check(url)
+	if cached is not None:
+		logging.info("SUCCESS: %s %s is accessible (cached result).", type_, url)
+		return cached
+
 	result = {"url": url, "type": type_, "status": None, "response_time": None, "error": ""}
 	start = time.perf_counter()
 	try:
-		response = requests.get(url, timeout=10)
+		# Only the healthcheck body is inspected; other endpoints just need a status code, so skip the body
+		if type_ == "healthcheck":
+			response = SESSION.get(url, timeout=10)
+		else:
+			response = SESSION.head(url, timeout=10, allow_redirects=True)
+			if response.status_code == 405:
+				response = SESSION.get(url, timeout=10)
 		elapsed = time.perf_counter() - start
 		result["response_time"] = elapsed
 
@@ -60,27 +117,81 @@ def check_website(url, type_):
 			if type_ == "healthcheck" and "succes" not in response.text.lower():
 				result["status"] = "FAIL"
 				result["error"] = "Unexpected response content."
-				logging.error(f"FAIL: {type_} {url} returned unexpected response content.")
-				print(f"FAIL: {type_} {url} returned unexpected response content.")
+				logging.error("FAIL: %s %s returned unexpected response content.", type_, url)
 			else:
 				result["status"] = "SUCCESS"
-				logging.info(f"SUCCESS: {type_} {url} is accessible.")
-				print(f"SUCCESS: {type_} {url} is accessible. Response time: {elapsed:.2f} seconds.")
+				logging.info("SUCCESS: %s %s is accessible. Response time: %.2f seconds.", type_, url, elapsed)
+				store_cached_check(url, result)
 		else:
 			result["status"] = "FAIL"
 			result["error"] = f"Status code {response.status_code}"
-			logging.error(f"FAIL: {type_} {url} returned status {response.status_code}")
-			print(f"FAIL: {type_} {url} returned status code {response.status_code}.")
+			logging.error("FAIL: %s %s returned status code %s.", type_, url, response.status_code)
 	except requests.RequestException as e:
 		result["response_time"] = time.perf_counter() - start
 		result["status"] = "FAIL"
 		result["error"] = str(e)
-		logging.error(f"ERROR: {type_} {url} is not accessible. {str(e)}")
-		print(f"ERROR: {type_} {url} check encountered an error: {str(e)}")
+		logging.error("ERROR: %s %s is not accessible. %s", type_, url, e)
 
 	return result
 
 
+def enlarge_connection_pool(gis):
+	"""
+	Mounts a larger connection pool on the session the ArcGIS API uses internally,
+	so bursts of REST calls reuse connections instead of discarding and reopening them.
+	"""
+	session = getattr(gis._con, "_session", None)
+	if session is None:
+		return
+	adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=2)
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+
+
+# Authenticated GIS connection shared by everything in this run
+_GIS_SINGLETON = None
+
+
+def get_gis():
+	"""
+	Returns an authenticated GIS connection, creating it on first use.
+	A token cached on disk by a recent run is preferred over the saved token; the active token is cached only when it changed,
+	so the file age keeps measuring how long ago that token was issued.
+	"""
+	from arcgis.gis import GIS
+
+	global _GIS_SINGLETON
+	if _GIS_SINGLETON is not None:
+		return _GIS_SINGLETON
+
+	token_file = CONFIG["arcgis"]["token_cache_file"]
+	cached_token = None
+	if os.path.exists(token_file) and time.time() - os.stat(token_file).st_mtime < CONFIG["arcgis"]["token_ttl"]:
+		with open(token_file) as f:
+			cached_token = f.read().strip() or None
+	token = cached_token or saved_token
+
+	try:
+		gis = GIS(CONFIG["arcgis"]["url"], token=token)
+	except Exception:
+		if token == saved_token:
+			raise
+		logging.warning("Cached ArcGIS token was rejected. Falling back to the saved token.")
+		gis = GIS(CONFIG["arcgis"]["url"], token=saved_token)
+
+	enlarge_connection_pool(gis)
+
+	active_token = getattr(gis._con, "token", None)
+	if active_token and active_token != cached_token:
+		# The token is a credential, so create the file readable by the owner only
+		fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+		with os.fdopen(fd, "w") as f:
+			f.write(active_token)
+
+	_GIS_SINGLETON = gis
+	return gis
+
+
 def publish_test_layer():
 	"""
 	Publishes a test feature layer from an existing shapefile to verify ArcGIS database connectivity.
@@ -95,10 +206,11 @@ def publish_test_layer():
 	shapefile_name = CONFIG["arcgis"]["shapefile"]
 
 	try:
-		# Authenticate to the ArcGIS Portal using the saved token
-		gis = GIS(CONFIG["arcgis"]["url"], token=saved_token)
-		logging.info("Connected to ArcGIS Portal using saved token.")
-		print("SUCCESS: Connected to ArcGIS Portal using saved token.")
+		from arcgis.features import FeatureLayerCollection
+
+		# Authenticate to the ArcGIS Portal using the cached or saved token
+		gis = get_gis()
+		logging.info("SUCCESS: Connected to ArcGIS Portal.")
 
 		# Restrict content search to the logged-in user's items
 		current_user = gis.users.me
@@ -111,8 +223,7 @@ def publish_test_layer():
 		)
 		if search_results:
 			existing_layer = search_results[0]
-			logging.info(f"🗑️ Deleting existing test layer: {existing_layer.title}")
-			print(f"INFO: Deleting existing test layer: {existing_layer.title}")
+			logging.info("INFO: Deleting existing test layer: %s", existing_layer.title)
 			existing_layer.delete()
 
 		# Search for the shapefile item (only within the user's content)
@@ -123,28 +234,29 @@ def publish_test_layer():
 		if not search_results:
 			result["status"] = "FAIL"
 			result["error"] = "Shapefile not found in user content."
-			logging.error("Shapefile not found in user content.")
-			print("FAIL: Shapefile not found in user content.")
+			logging.error("FAIL: Shapefile not found in user content.")
 			result["response_time"] = time.perf_counter() - start
 			return result
 
 		item = search_results[0]
-		logging.info(f"Found shapefile in user content: {item.title}")
-		print(f"SUCCESS: Found shapefile in user content: {item.title}")
+		logging.info("SUCCESS: Found shapefile in user content: %s", item.title)
 		# Publish the shapefile as a feature service
 		published_item = item.publish()
 
 		if published_item:
-			logging.info("Test layer successfully published.")
-			print("SUCCESS: Test layer successfully published.")
-			time.sleep(5)  # Pause briefly to allow the service to initialize
+			logging.info("SUCCESS: Test layer successfully published.")
+			# Wait until the service answers (at most ~5 seconds) so it is initialized before deletion
+			for _ in range(20):
+				try:
+					FeatureLayerCollection(published_item.url, gis).properties
+					break
+				except Exception:
+					time.sleep(0.25)
 			published_item.delete()
-			logging.info("Test layer deleted successfully.")
-			print("SUCCESS: Test layer deleted successfully.")
+			logging.info("SUCCESS: Test layer deleted successfully.")
 			result["status"] = "SUCCESS"
 		else:
-			logging.error("Test layer failed to publish.")
-			print("FAIL: Test layer failed to publish.")
+			logging.error("FAIL: Test layer failed to publish.")
 			result["status"] = "FAIL"
 			result["error"] = "Test layer failed to publish."
 
@@ -152,14 +264,33 @@ def publish_test_layer():
 		return result
 
 	except Exception as e:
-		logging.error(f"ERROR: Failed to publish test layer. {str(e)}")
-		print(f"ERROR: Failed to publish test layer: {str(e)}")
+		logging.error("ERROR: Failed to publish test layer: %s", e)
 		result["status"] = "FAIL"
 		result["error"] = str(e)
 		result["response_time"] = time.perf_counter() - start
 		return result
 
 
+def draw_text_lines(c, lines, y_position, font, size, leading, margin, height):
+	"""
+	Draws lines of text as buffered ReportLab text objects, starting a new page when the margin is reached.
+	Returns the vertical position following the last line.
+	"""
+	text = c.beginText(margin, y_position)
+	text.setFont(font, size)
+	text.setLeading(leading)
+	for line in lines:
+		if text.getY() < margin:
+			c.drawText(text)
+			c.showPage()
+			text = c.beginText(margin, height - margin)
+			text.setFont(font, size)
+			text.setLeading(leading)
+		text.textLine(line)
+	c.drawText(text)
+	return text.getY()
+
+
 def generate_pdf_report(website_results, arcgis_result):
 	"""
 	Generates a PDF report of the health-check results using ReportLab.
@@ -168,6 +299,9 @@ def generate_pdf_report(website_results, arcgis_result):
 	average response times, and ArcGIS publishing test results), and detailed check results.
 	Returns the filename of the generated PDF report.
 	"""
+	from reportlab.pdfgen import canvas
+	from reportlab.lib.pagesizes import letter
+
 	timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 	pdf_filename = f"logs_reports/arcgis_health_report_{timestamp}.pdf"
 	c = canvas.Canvas(pdf_filename, pagesize=letter)
@@ -191,7 +325,6 @@ def generate_pdf_report(website_results, arcgis_result):
 	c.setFont("Helvetica-Bold", 14)
 	c.drawString(margin, y_position, "Summary Statistics:")
 	y_position -= 20
-	c.setFont("Helvetica", 12)
 	summary_lines = [
 		f"Total Websites Checked: {total_websites}",
 		f"Successful Checks: {success_count}",
@@ -201,19 +334,14 @@ def generate_pdf_report(website_results, arcgis_result):
 		f"ArcGIS Publishing Test Response Time: {arcgis_result['response_time']:.2f} seconds",
 		f"ArcGIS Publishing Test Error: {arcgis_result['error']}" if arcgis_result['error'] else ""
 	]
-	for line in summary_lines:
-		if y_position < margin:
-			c.showPage()
-			y_position = height - margin
-		c.drawString(margin, y_position, line)
-		y_position -= 15
+	y_position = draw_text_lines(c, summary_lines, y_position, "Helvetica", 12, 15, margin, height)
 
 	# Write detailed website check results to the PDF
 	y_position -= 20
 	c.setFont("Helvetica-Bold", 14)
 	c.drawString(margin, y_position, "Detailed Website Check Results:")
 	y_position -= 20
-	c.setFont("Helvetica", 10)
+	detail_lines = []
 	for r in website_results:
 		details = (
 			f"URL: {r['url']}, Type: {r['type']}, Status: {r['status']}, "
@@ -221,16 +349,12 @@ def generate_pdf_report(website_results, arcgis_result):
 		)
 		if r["error"]:
 			details += f", Error: {r['error']}"
-		if y_position < margin:
-			c.showPage()
-			y_position = height - margin
-		c.drawString(margin, y_position, details)
-		y_position -= 12
+		detail_lines.append(details)
+	y_position = draw_text_lines(c, detail_lines, y_position, "Helvetica", 10, 12, margin, height)
 
 	# Save the PDF file
 	c.save()
-	logging.info(f"PDF report generated: {pdf_filename}")
-	print(f"SUCCESS: PDF report generated: {pdf_filename}")
+	logging.info("SUCCESS: PDF report generated: %s", pdf_filename)
 	return pdf_filename
 
 
@@ -240,6 +364,9 @@ def send_email(subject, message, attachment_path=None):
 	This function logs in to the SMTP server using the credentials in the configuration,
 	attaches the PDF report if provided, and sends the message.
 	"""
+	import smtplib
+	from email.message import EmailMessage
+
 	try:
 		msg = EmailMessage()
 		msg.set_content(message)
@@ -249,41 +376,38 @@ def send_email(subject, message, attachment_path=None):
 
 		# Attach the PDF report if a valid attachment path is provided
 		if attachment_path is not None:
-			with open(attachment_path, "rb") as f:
-				file_data = f.read()
-				file_name = os.path.basename(attachment_path)
-			msg.add_attachment(file_data, maintype="application", subtype="pdf", filename=file_name)
+			file_name = os.path.basename(attachment_path)
+			# Map the report read-only instead of reading it through a buffered file object
+			with open(attachment_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+				msg.add_attachment(bytes(mm), maintype="application", subtype="pdf", filename=file_name)
 
 		with smtplib.SMTP(CONFIG["smtp"]["server"], CONFIG["smtp"]["port"]) as server:
 			server.starttls()
 			server.login(CONFIG["smtp"]["username"], CONFIG["smtp"]["password"])
 			server.send_message(msg)
-			logging.info("Email alert sent successfully.")
-			print("SUCCESS: Email alert sent successfully.")
+			logging.info("SUCCESS: Email alert sent successfully.")
 	except Exception as e:
-		logging.error(f"ERROR: Failed to send email. {str(e)}")
-		print(f"ERROR: Failed to send email: {str(e)}")
+		logging.error("ERROR: Failed to send email: %s", e)
 
 # Run website health checks for all configured endpoints
-website_results = []
-print("Starting website health checks...")
-for site in CONFIG["websites"]:
-	result = check_website(site["url"], site["type"])
-	website_results.append(result)
-print("SUCCESS: Website health checks completed.\n")
+# Endpoints are independent, so probe them concurrently; map() keeps the configured order
+logging.info("Starting website health checks...")
+with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(CONFIG["websites"]))) as executor:
+	website_results = list(executor.map(lambda site: check_website(site["url"], site["type"]), CONFIG["websites"]))
+logging.info("SUCCESS: Website health checks completed.")
 
 # Run the ArcGIS Publishing Test
-print("Starting ArcGIS publishing test...")
+logging.info("Starting ArcGIS publishing test...")
 arcgis_result = publish_test_layer()
 if arcgis_result["status"] == "SUCCESS":
-	print("SUCCESS: ArcGIS publishing test completed.\n")
+	logging.info("SUCCESS: ArcGIS publishing test completed.")
 else:
-	print("FAIL: ArcGIS publishing test failed.\n")
+	logging.error("FAIL: ArcGIS publishing test failed.")
 
 # Generate the PDF report from the collected results
-print("Generating PDF report...")
+logging.info("Generating PDF report...")
 pdf_report = generate_pdf_report(website_results, arcgis_result)
-print("SUCCESS: PDF report generation completed.\n")
+logging.info("SUCCESS: PDF report generation completed.")
 
 # Determine if any failures occurred in the checks
 failures = [r for r in website_results if r["status"] != "SUCCESS"]
@@ -300,9 +424,9 @@ if failures:
 	if arcgis_result["status"] != "SUCCESS":
 		error_message += f"\nArcGIS Publishing Test: {arcgis_result['error']}"
 	error_message += "\n\nPlease investigate immediately."
-	print("ALERT: Failures detected. Sending alert email...")
+	logging.warning("ALERT: Failures detected. Sending alert email...")
 	send_email("🚨 ALERT: ArcGIS Server Health Check Failure", error_message, attachment_path=pdf_report)
 else:
 	success_message = "✅ All ArcGIS services are running normally."
-	print("SUCCESS: All ArcGIS services are running normally. Sending success email...")
+	logging.info("SUCCESS: All ArcGIS services are running normally. Sending success email...")
 	send_email("✅ ArcGIS Health Check Passed", success_message, attachment_path=pdf_report)
@@ -1,7 +1,18 @@
 import os
+import sys
+import time
+import hashlib
+import shelve
+import atexit
 import logging
-from arcgis.gis import GIS
-import matplotlib.pyplot as plt
+import logging.handlers
+import concurrent.futures
+import multiprocessing
+from arcgis.gis import GIS, User
+import numpy as np
+from requests.adapters import HTTPAdapter
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from datetime import datetime, timedelta, timezone
 import csv
 from collections import Counter
@@ -25,9 +36,15 @@ file_handler = logging.FileHandler(log_file_path)
 file_handler.setLevel(logging.INFO)
 formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
 file_handler.setFormatter(formatter)
-logging.getLogger().addHandler(file_handler)
+# Buffer file records in memory; they are written out on WARNING/ERROR, when the buffer fills, or at exit
+buffered_file_handler = logging.handlers.MemoryHandler(10000, flushLevel=logging.WARNING, target=file_handler)
+buffered_file_handler.setLevel(logging.INFO)
+logging.getLogger().addHandler(buffered_file_handler)
 logging.info("Starting ArcGIS User Management Report Generation")
 
+# Per-user messages are logged at DEBUG; check the level once so their formatting is skipped otherwise
+debug_enabled = logging.getLogger().isEnabledFor(logging.DEBUG)
+
 # Configuration settings: SMTP details and inactivity threshold (in days)
 CONFIG = {
 	"smtp": {
@@ -35,13 +52,88 @@ CONFIG = {
 		"port": 587,
 		"username": "",
 		"password": "",
-		"recipient": ""
+		"recipient": "",
+		# Reconnect after this many messages to stay within provider limits
+		"max_messages_per_connection": 100
 	},
-	"inactive_threshold": 70
+	"inactive_threshold": 70,
+	# Concurrent portal requests while collecting per-user details; keep this small
+	"max_workers": 8,
+	# Group memberships are cached on disk and refreshed once they are older than meta_ttl seconds
+	"meta_cache_file": os.path.join(reports_folder, "user_meta.cache"),
+	"meta_ttl": 24 * 60 * 60,
+	# Fingerprint of the last reported user state; the PDF and email are skipped while it is unchanged
+	"manifest_hash_file": os.path.join(reports_folder, ".last_hash")
 }
 
+class SMTPClient:
+	"""SMTP connection that is opened on first use and reused for later messages."""
+
+	def __init__(self, settings):
+		self.settings = settings
+		self.max_messages = settings.get("max_messages_per_connection", 100)
+		self._server = None
+		self._sent = 0
+
+	def _connect(self):
+		logging.info("Connecting to SMTP server")
+		server = smtplib.SMTP(self.settings["server"], self.settings["port"])
+		try:
+			server.starttls()
+			server.login(self.settings["username"], self.settings["password"])
+		except Exception:
+			# Do not leak the socket when the handshake or login is rejected
+			server.close()
+			raise
+		self._server = server
+		self._sent = 0
+
+	def _ensure_connected(self):
+		"""Reuse the open connection if the server still answers, otherwise reconnect."""
+		if self._server is not None and self._sent >= self.max_messages:
+			self.close()
+		if self._server is not None:
+			try:
+				self._server.noop()
+			except smtplib.SMTPServerDisconnected:
+				self._server = None
+		if self._server is None:
+			self._connect()
+
+	def send(self, msg, attempts=3):
+		"""Send a message, retrying with exponential backoff on dropped connections and 4xx replies.
+		Authentication failures and permanent (5xx) errors are raised immediately."""
+		for attempt in range(attempts):
+			try:
+				self._ensure_connected()
+				self._server.send_message(msg)
+				self._sent += 1
+				return
+			except smtplib.SMTPAuthenticationError:
+				raise
+			except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+				transient = isinstance(e, smtplib.SMTPServerDisconnected) or 400 <= e.smtp_code < 500
+				if not transient or attempt == attempts - 1:
+					raise
+				logging.warning("Transient SMTP error on attempt %s of %s: %s", attempt + 1, attempts, e)
+				self.close()
+				time.sleep(2 ** attempt)
+
+	def close(self):
+		if self._server is None:
+			return
+		try:
+			self._server.quit()
+		except smtplib.SMTPException:
+			pass
+		self._server = None
+
+# Shared SMTP client; the connection is closed cleanly when the script exits
+smtp_client = SMTPClient(CONFIG["smtp"])
+atexit.register(smtp_client.close)
+
 def send_email(subject, message, attachment_path=None):
-	"""Send an email with an optional PDF attachment."""
+	"""Send an email with an optional PDF attachment. Returns True if the message was sent."""
 	try:
 		msg = EmailMessage()
 		msg.set_content(message)
@@ -55,19 +147,31 @@ def send_email(subject, message, attachment_path=None):
 				file_data = f.read()
 			msg.add_attachment(file_data, maintype="application", subtype="pdf",
 				filename=os.path.basename(attachment_path))
-			logging.info(f"Attached PDF report: {attachment_path}")
+			logging.info("Attached PDF report: %s", attachment_path)
 
-		with smtplib.SMTP(CONFIG["smtp"]["server"], CONFIG["smtp"]["port"]) as server:
-			logging.info("Connecting to SMTP server")
-			server.starttls()
-			server.login(CONFIG["smtp"]["username"], CONFIG["smtp"]["password"])
-			server.send_message(msg)
-			logging.info("Email alert sent successfully.")
+		smtp_client.send(msg)
+		logging.info("Email alert sent successfully.")
+		return True
 	except Exception as e:
-		logging.error(f"Failed to send email: {e}")
+		logging.error("Failed to send email: %s", e)
+		return False
+
+def _draw_chart(c, buf, y_position, width, height, display_width=400):
+	"""Draw a chart image centred on the page, starting a new page if it does not fit.
+	Returns the vertical position below the chart."""
+	image = ImageReader(buf)
+	img_width, img_height = image.getSize()
+	display_height = display_width * img_height / float(img_width)
+	x_position = (width - display_width) / 2
+	if y_position - display_height < 50:
+		c.showPage()
+		y_position = height - 50
+	c.drawImage(image, x_position, y_position - display_height, width=display_width, height=display_height,
+		preserveAspectRatio=True, mask='auto')
+	return y_position - display_height - 20
 
 def generate_pdf_report(pdf_path, summary_message, csv_file_path, pie_buffer, bar_buffer, role_buffer):
-	"""Generate a PDF report with a header, summary text, and embedded charts."""
+	"""Generate a PDF report with a header, summary text, and embedded charts. Returns True on success."""
 	try:
 		c = canvas.Canvas(pdf_path, pagesize=letter)
 		width, height = letter
@@ -79,68 +183,169 @@ def generate_pdf_report(pdf_path, summary_message, csv_file_path, pie_buffer, ba
 		c.drawCentredString(width / 2, y_position, header_text)
 		y_position -= 30
 
-		# Draw the summary text
-		c.setFont("Helvetica", 10)
+		# Draw the summary text as one text object per page so the font is set once, not per line
 		logging.info("Adding summary text to PDF report")
+		text = c.beginText(50, y_position)
+		text.setFont("Helvetica", 10)
+		text.setLeading(12)
 		for line in summary_message.splitlines():
-			c.drawString(50, y_position, line)
-			y_position -= 12
-			if y_position < 100:
+			text.textLine(line)
+			if text.getY() < 100:
+				c.drawText(text)
 				c.showPage()
-				y_position = height - 50
-				c.setFont("Helvetica", 10)
-		y_position -= 20
+				text = c.beginText(50, height - 50)
+				text.setFont("Helvetica", 10)
+				text.setLeading(12)
+		c.drawText(text)
+		y_position = text.getY() - 20
 
 		# Embed the Pie Chart (Active vs. Inactive Users)
 		if pie_buffer:
 			logging.info("Embedding Pie Chart in PDF")
-			pie_image = ImageReader(pie_buffer)
-			img_width, img_height = pie_image.getSize()
-			aspect = img_height / float(img_width)
-			display_width = 400
-			display_height = display_width * aspect
-			x_position = (width - display_width) / 2
-			if y_position - display_height < 50:
-				c.showPage()
-				y_position = height - 50
-			c.drawImage(pie_image, x_position, y_position - display_height, width=display_width, height=display_height)
-			y_position -= display_height + 20
+			y_position = _draw_chart(c, pie_buffer, y_position, width, height)
 
 		# Embed the Bar Chart (Suggested Actions Distribution)
 		if bar_buffer:
 			logging.info("Embedding Bar Chart in PDF")
-			bar_image = ImageReader(bar_buffer)
-			img_width, img_height = bar_image.getSize()
-			aspect = img_height / float(img_width)
-			display_width = 400
-			display_height = display_width * aspect
-			x_position = (width - display_width) / 2
-			if y_position - display_height < 50:
-				c.showPage()
-				y_position = height - 50
-			c.drawImage(bar_image, x_position, y_position - display_height, width=display_width, height=display_height)
-			y_position -= display_height + 20
+			y_position = _draw_chart(c, bar_buffer, y_position, width, height)
 
 		# Embed the Extra Chart (User Role Distribution)
 		if role_buffer:
 			logging.info("Embedding User Role Distribution Chart in PDF")
-			role_image = ImageReader(role_buffer)
-			img_width, img_height = role_image.getSize()
-			aspect = img_height / float(img_width)
-			display_width = 400
-			display_height = display_width * aspect
-			x_position = (width - display_width) / 2
-			if y_position - display_height < 50:
-				c.showPage()
-				y_position = height - 50
-			c.drawImage(role_image, x_position, y_position - display_height, width=display_width, height=display_height)
-			y_position -= display_height + 20
+			y_position = _draw_chart(c, role_buffer, y_position, width, height)
 
 		c.showPage()
 		c.save()
-		logging.info(f"PDF report generated at '{pdf_path}'")
+		logging.info("PDF report generated at '%s'", pdf_path)
+		return True
 	except Exception as e:
-		logging.error(f"Error generating PDF report: {e}")
+		logging.error("Error generating PDF report: %s", e)
+		return False
+
+def enlarge_connection_pool(gis):
+	"""
+	Mounts a larger connection pool on the session the ArcGIS API uses internally,
+	so bursts of REST calls reuse connections instead of discarding and reopening them.
+	"""
+	session = getattr(gis._con, "_session", None)
+	if session is None:
+		return
+	adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=2)
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+
+def load_user_meta_cache():
+	"""Load cached per-user metadata (username -> groups and cache time) from disk."""
+	try:
+		with shelve.open(CONFIG["meta_cache_file"]) as cache:
+			return dict(cache)
+	except Exception as e:
+		logging.warning("Could not read user metadata cache: %s", e)
+		return {}
+
+def save_user_meta_cache(entries):
+	"""Write refreshed per-user metadata back to the on-disk cache."""
+	try:
+		with shelve.open(CONFIG["meta_cache_file"]) as cache:
+			cache.update(entries)
+	except Exception as e:
+		logging.warning("Could not write user metadata cache: %s", e)
+
+def enrich_user(user, cached_meta=None, count_content=True):
+	"""Fetch the group titles and content count of a user; each is a separate portal request.
+	Group titles are taken from cached_meta instead while it is younger than the configured TTL.
+	The content count is only fetched when count_content is set; otherwise it is None."""
+	meta = None
+	if cached_meta and time.time() - cached_meta["cached_at"] < CONFIG["meta_ttl"]:
+		groups = cached_meta["groups"]
+	else:
+		# Retrieve group information
+		try:
+			groups = ", ".join([group.title for group in user.groups]) if user.groups else "No Groups"
+			if debug_enabled:
+				logging.debug("User %s groups: %s", user.username, groups)
+			meta = {"groups": groups, "cached_at": time.time()}
+		except Exception as ex:
+			groups = "No Groups"
+			logging.error("Error retrieving groups for user %s: %s", user.username, ex)
+
+	# Get the number of content items for the user
+	content_count = None
+	if count_content:
+		try:
+			items = user.items()
+			content_count = len(items)
+			if debug_enabled:
+				logging.debug("User %s has %s content items", user.username, content_count)
+		except Exception as e:
+			logging.error("Error retrieving items for user %s: %s", user.username, e)
+			content_count = 0
+
+	return {"groups": groups, "content_count": content_count, "meta": meta}
+
+def fetch_portal_users(gis, page_size=100):
+	"""Fetch the raw JSON records of all portal users from the portals/self/users endpoint.
+	The first page reports the total; the remaining pages are requested concurrently."""
+	def fetch_page(start):
+		return gis._portal.con.post("portals/self/users", {"start": start, "num": page_size, "f": "json"})
+
+	first_page = fetch_page(1)
+	users = list(first_page.get("users", []))
+	starts = range(page_size + 1, first_page.get("total", 0) + 1, page_size)
+	with concurrent.futures.ThreadPoolExecutor(max_workers=CONFIG.get("max_workers", 8)) as executor:
+		for page in executor.map(fetch_page, starts):
+			users.extend(page.get("users", []))
+	return users
+
+def render_chart(fig, chart_canvas, kind, labels, values, title, xlabel=None, ylabel=None, aspect=0.75, display_width=400):
+	"""Draw a pie or bar chart on the shared figure and return it as an in-memory PNG.
+	The image is rendered at the size it is shown in the PDF (display_width points at 72 dpi),
+	so ReportLab embeds it without resampling."""
+	fig.clear()
+	fig.set_dpi(72)
+	fig.set_size_inches(display_width / 72, display_width * aspect / 72)
+	ax = fig.add_subplot(111)
+	if kind == "pie":
+		ax.pie(values, labels=labels, autopct='%1.1f%%')
+	else:
+		positions = range(len(labels))
+		ax.bar(positions, values)
+		ax.set_xticks(positions, labels, rotation=45, ha='right')
+		ax.set_xlabel(xlabel)
+		ax.set_ylabel(ylabel)
+	ax.set_title(title)
+	if kind != "pie":
+		fig.tight_layout()
+	buffer = io.BytesIO()
+	chart_canvas.print_png(buffer, pil_kwargs={"optimize": True, "compress_level": 6})
+	fig.clear()
+	buffer.seek(0)
+	return buffer
+
+# Figure reused by every chart rendered in the current process
+_chart_figure = None
+
+def render_chart_png(kind, labels, values, title, xlabel=None, ylabel=None, aspect=0.75):
+	"""Render a chart to PNG bytes. Arguments and result are picklable, so this can run in a worker process."""
+	global _chart_figure
+	if _chart_figure is None:
+		_chart_figure = Figure(figsize=(400 / 72, 300 / 72), dpi=72)
+		FigureCanvasAgg(_chart_figure)
+	return render_chart(_chart_figure, _chart_figure.canvas, kind, labels, values, title,
+		xlabel=xlabel, ylabel=ylabel, aspect=aspect).getvalue()
+
+def render_charts(jobs):
+	"""Render charts given as name -> render_chart_png arguments and return name -> PNG buffer.
+	Charts are rendered in parallel on forked worker processes; where fork is unavailable
+	(it would re-run this script in each worker) they are rendered one after another here."""
+	if len(jobs) > 1 and "fork" in multiprocessing.get_all_start_methods():
+		# Write out buffered log records first; a forked worker would otherwise inherit and flush them again
+		buffered_file_handler.flush()
+		with concurrent.futures.ProcessPoolExecutor(max_workers=len(jobs),
+				mp_context=multiprocessing.get_context("fork")) as executor:
+			futures = {name: executor.submit(render_chart_png, *args) for name, args in jobs.items()}
+			return {name: io.BytesIO(future.result()) for name, future in futures.items()}
+	return {name: io.BytesIO(render_chart_png(*args)) for name, args in jobs.items()}
 
 # Set CET timezone (Central European Time)
 tz_cet = timezone(timedelta(hours=1))
@@ -150,111 +355,138 @@ logging.info("Timezone set to CET")
 saved_token = "Q"
 try:
 	gis = GIS("https://gis.czu.cz/portal", token=saved_token)
+	enlarge_connection_pool(gis)
 	logging.info("Connected to ArcGIS Portal")
 except Exception as e:
-	logging.error(f"Failed to connect to ArcGIS Portal: {e}")
+	logging.error("Failed to connect to ArcGIS Portal: %s", e)
 	exit()
 
 # Set the inactivity threshold (in days)
 inactive_threshold = CONFIG.get("inactive_threshold", 70)
-logging.info(f"Inactivity threshold set to {inactive_threshold} days.")
+logging.info("Inactivity threshold set to %s days.", inactive_threshold)
 
 # Retrieve all users from the GIS portal
 logging.info("Retrieving all users from the portal")
-all_users = gis.users.search(max_users=1000)
-logging.info(f"Retrieved {len(all_users)} users from the portal")
+raw_users = fetch_portal_users(gis)
+logging.info("Retrieved %s users from the portal", len(raw_users))
+
+# Keep the user attributes as columns; User objects are only needed for the group and content lookups
+user_columns = {
+	"username": [u["username"] for u in raw_users],
+	"full_name": [u.get("fullName", "") for u in raw_users],
+	"email": [u.get("email", "") for u in raw_users],
+	"role": [u.get("role", "") for u in raw_users],
+	"last_login": [u.get("lastLogin", -1) for u in raw_users]
+}
+all_users = [User(gis, u["username"], userdict=u) for u in raw_users]
 
 now = datetime.now(timezone.utc)
 logging.info("Current UTC time obtained")
 
-user_data = []
-inactive_users = []
-role_counts = Counter()
-suggested_actions_counter = Counter()
+# Days since last login for all users at once (-1 for users who never logged in)
+now_ms = int(now.timestamp() * 1000)
+last_login_ms = np.asarray(user_columns["last_login"], dtype="int64")
+never_logged_in = last_login_ms == -1
+days_inactive_arr = np.where(never_logged_in, -1, (now_ms - last_login_ms) // 86_400_000)
+
+# Count roles in one pass over the role column
+role_counts = Counter(user_columns["role"])
+
+# Users who never logged in or exceed the threshold are candidates for removal. Only their content
+# count affects the suggested action, so the item lookup is skipped for everyone else.
+removal_candidate = never_logged_in | (days_inactive_arr > inactive_threshold)
+
+# Fetch groups and content counts for all users concurrently; map() keeps the users' order
+logging.info("Retrieving groups and content for all users")
+user_meta_cache = load_user_meta_cache()
+with concurrent.futures.ThreadPoolExecutor(max_workers=CONFIG.get("max_workers", 8)) as executor:
+	enriched_users = list(executor.map(
+		lambda user, candidate: enrich_user(user, user_meta_cache.get(user.username), bool(candidate)),
+		all_users, removal_candidate))
+refreshed_meta = {user.username: enriched["meta"] for user, enriched in zip(all_users, enriched_users) if enriched["meta"]}
+save_user_meta_cache(refreshed_meta)
+logging.info("Group memberships refreshed for %s users, %s taken from cache", len(refreshed_meta), len(all_users) - len(refreshed_meta))
+
+# Classify all users at once: the amount of content a removal candidate owns decides what happens to it.
+# Users whose content was not counted are stored as -1.
+content_arr = np.asarray(
+	[-1 if enriched["content_count"] is None else enriched["content_count"] for enriched in enriched_users],
+	dtype="int64")
+suggested_actions = np.select(
+	[removal_candidate & (content_arr > 5), removal_candidate & (content_arr > 0), removal_candidate],
+	["Archive content and delete user", "Delete both content and user", "Delete user"],
+	default="Do nothing"
+)
+action_names, action_counts = np.unique(suggested_actions, return_counts=True)
+suggested_actions_counter = {str(action): int(count) for action, count in zip(action_names, action_counts)}
 
-# Process each user and collect relevant data
+# Build the remaining report columns for all users at once
 logging.info("Processing user data")
-for user in all_users:
-	logging.info(f"Processing user: {user.username}")
-	# Determine the last login and inactivity period
-	if user.lastLogin == -1:
-		last_login = "Never Logged In"
-		days_inactive = None
-		logging.debug(f"User {user.username} has never logged in.")
-	else:
-		last_login_dt = datetime.fromtimestamp(user.lastLogin / 1000, tz=timezone.utc)
-		last_login = last_login_dt.strftime("%Y-%m-%d")
-		days_inactive = (now - last_login_dt).days
-		logging.debug(f"User {user.username} last logged in on {last_login} ({days_inactive} days ago)")
-
-	role = user.role
-	role_counts[role] += 1
-
-	# Retrieve group information
-	try:
-		groups = ", ".join([group.title for group in user.groups]) if user.groups else "No Groups"
-		logging.debug(f"User {user.username} groups: {groups}")
-	except Exception as ex:
-		groups = "No Groups"
-		logging.error(f"Error retrieving groups for user {user.username}: {ex}")
-
-	# Get the number of content items for the user
-	try:
-		items = user.items()
-		content_count = len(items)
-		logging.debug(f"User {user.username} has {content_count} content items")
-	except Exception as e:
-		logging.error(f"Error retrieving items for user {user.username}: {e}")
-		content_count = 0
-
-	# Determine the suggested action based on inactivity and content count
-	suggested_action = "Do nothing"
-	if last_login == "Never Logged In" or (days_inactive is not None and days_inactive > inactive_threshold):
-		if content_count > 0:
-			if content_count > 5:
-				suggested_action = "Archive content and delete user"
-			else:
-				suggested_action = "Delete both content and user"
-		else:
-			suggested_action = "Delete user"
-	logging.info(f"Suggested action for user {user.username}: {suggested_action}")
-	suggested_actions_counter[suggested_action] += 1
-
-	user_data.append([
-		user.username, user.fullName, user.email, role, groups,
-		last_login, days_inactive, content_count, suggested_action
-	])
-	if days_inactive and days_inactive > inactive_threshold:
-		inactive_users.append([user.username, last_login, days_inactive])
-
-logging.info(f"Found {len(all_users)} users. {len(inactive_users)} inactive for more than {inactive_threshold} days.")
-
-# Save user details and decision support data to a CSV file
+last_login_column = [
+	"Never Logged In" if never else datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+	for never, ms in zip(never_logged_in.tolist(), last_login_ms.tolist())
+]
+days_inactive_column = [None if never else days for never, days in zip(never_logged_in.tolist(), days_inactive_arr.tolist())]
+groups_column = [enriched["groups"] for enriched in enriched_users]
+content_column = ["n/a" if enriched["content_count"] is None else enriched["content_count"] for enriched in enriched_users]
+suggested_actions_column = suggested_actions.tolist()
+
+if debug_enabled:
+	for username, last_login, days_inactive, suggested_action in zip(
+			user_columns["username"], last_login_column, days_inactive_column, suggested_actions_column):
+		logging.debug("User %s last login: %s (%s days inactive), suggested action: %s",
+			username, last_login, days_inactive, suggested_action)
+
+# Users who have logged in, but not within the threshold
+inactive_count = int(np.count_nonzero(~never_logged_in & (days_inactive_arr > inactive_threshold)))
+logging.info("Found %s users. %s inactive for more than %s days.", len(all_users), inactive_count, inactive_threshold)
+
+# Save user details and decision support data to a CSV file.
+# Rows are zipped lazily from the columns, so writerows streams them without building a row table.
 csv_file_path = os.path.join(reports_folder, "inactive_users_report.csv")
 try:
-	with open(csv_file_path, "w", newline="", encoding="utf-8-sig") as file:
+	with open(csv_file_path, "w", newline="", encoding="utf-8-sig", buffering=1 << 20) as file:
 		writer = csv.writer(file)
 		writer.writerow([
 			"Username", "Full Name", "Email", "Role", "Groups",
 			"Last Login", "Days Inactive", "Content Count", "Suggested Action"
 		])
-		writer.writerows(user_data)
-	logging.info(f"User details report saved as '{csv_file_path}'")
+		writer.writerows(zip(
+			user_columns["username"], user_columns["full_name"], user_columns["email"], user_columns["role"],
+			groups_column, last_login_column, days_inactive_column, content_column, suggested_actions_column
+		))
+	logging.info("User details report saved as '%s'", csv_file_path)
 except Exception as e:
-	logging.error(f"Error saving CSV report: {e}")
+	logging.error("Error saving CSV report: %s", e)
+
+# Fingerprint the report-relevant user state and stop early if it matches the previous run
+content_bucket = np.select([content_arr < 0, content_arr == 0, content_arr <= 5], ["n/a", "0", "1-5"], default=">5")
+manifest = hashlib.blake2b(usedforsecurity=False)
+for entry in sorted(zip(user_columns["username"], user_columns["last_login"], user_columns["role"], content_bucket.tolist())):
+	manifest.update(repr(entry).encode())
+manifest_hash = manifest.hexdigest()
+try:
+	with open(CONFIG["manifest_hash_file"]) as f:
+		previous_hash = f.read().strip()
+except OSError:
+	previous_hash = None
+if manifest_hash == previous_hash:
+	logging.info("No changes in user data since the last report; skipping PDF and email")
+	sys.exit()
 
 # Calculate key statistics for the summary
+# Each statistic is a single reduction over the columns already in memory
 total_users = len(all_users)
-total_content = sum([row[7] for row in user_data])
-average_content = total_content / total_users if total_users > 0 else 0
-inactive_days_list = [row[6] for row in user_data if row[6] is not None]
-average_inactive_days = sum(inactive_days_list) / len(inactive_days_list) if inactive_days_list else 0
+counted_content = content_arr[content_arr >= 0]
+average_content = float(counted_content.mean()) if counted_content.size else 0
+known_days_inactive = days_inactive_arr[~never_logged_in]
+average_inactive_days = float(known_days_inactive.mean()) if known_days_inactive.size else 0
 
 stats_summary = (
 	f"Total Users: {total_users}\n"
-	f"Average Content Count per User: {average_content:.2f}\n"
+	f"Average Content Count per User (removal candidates): {average_content:.2f}\n"
 	f"Average Inactive Days (for users with data): {average_inactive_days:.2f}\n"
-	f"Inactive Users (> {inactive_threshold} days): {len(inactive_users)}\n"
+	f"Inactive Users (> {inactive_threshold} days): {inactive_count}\n"
 )
 
 # Build the summary message including statistics and suggested actions distribution
@@ -269,70 +501,44 @@ summary_message += f"\nDetailed CSV Report: {csv_file_path}"
 
 logging.info("Summary message built for PDF report")
 
-# Generate charts in memory
+# Generate charts in memory; each chart is independent, so they are rendered side by side
+chart_jobs = {}
 
 # Pie Chart: Active vs. Inactive Users
-active_count = max(0, len(all_users) - len(inactive_users))
-inactive_count = max(0, len(inactive_users))
+active_count = max(0, len(all_users) - inactive_count)
 if active_count + inactive_count > 0:
-	pie_buffer = io.BytesIO()
 	logging.info("Generating Pie Chart for Active vs. Inactive Users")
-	plt.figure(figsize=(6, 6))
-	plt.pie([active_count, inactive_count], labels=["Active Users", "Inactive Users"],
-		autopct='%1.1f%%')
-	plt.title("Active vs. Inactive Users")
-	plt.savefig(pie_buffer, format="png")
-	plt.close()
-	pie_buffer.seek(0)
+	chart_jobs["pie"] = ("pie", ["Active Users", "Inactive Users"], [active_count, inactive_count],
+		"Active vs. Inactive Users", None, None, 1.0)
 else:
-	pie_buffer = None
 	logging.warning("No data available for Pie Chart generation")
 
 # Bar Chart: Suggested Actions Distribution
 if suggested_actions_counter:
-	bar_buffer = io.BytesIO()
 	logging.info("Generating Bar Chart for Suggested Actions Distribution")
-	plt.figure(figsize=(8, 6))
-	actions = list(suggested_actions_counter.keys())
-	counts = list(suggested_actions_counter.values())
-	plt.bar(actions, counts)
-	plt.xlabel("Suggested Action")
-	plt.ylabel("Number of Users")
-	plt.title("Suggested Actions Distribution")
-	plt.xticks(rotation=45, ha='right')
-	plt.tight_layout()
-	plt.savefig(bar_buffer, format="png")
-	plt.close()
-	bar_buffer.seek(0)
+	chart_jobs["bar"] = ("bar", list(suggested_actions_counter.keys()), list(suggested_actions_counter.values()),
+		"Suggested Actions Distribution", "Suggested Action", "Number of Users")
 else:
-	bar_buffer = None
 	logging.warning("No data available for Bar Chart generation")
 
 # Chart: User Role Distribution
 if role_counts:
-	role_buffer = io.BytesIO()
 	logging.info("Generating Bar Chart for User Role Distribution")
-	plt.figure(figsize=(8, 6))
-	roles = list(role_counts.keys())
-	counts = list(role_counts.values())
-	plt.bar(roles, counts)
-	plt.xlabel("User Role")
-	plt.ylabel("Number of Users")
-	plt.title("User Role Distribution")
-	plt.xticks(rotation=45, ha='right')
-	plt.tight_layout()
-	plt.savefig(role_buffer, format="png")
-	plt.close()
-	role_buffer.seek(0)
+	chart_jobs["role"] = ("bar", list(role_counts.keys()), list(role_counts.values()),
+		"User Role Distribution", "User Role", "Number of Users")
 else:
-	role_buffer = None
 	logging.warning("No data available for User Role Distribution Chart generation")
 
+chart_buffers = render_charts(chart_jobs)
+pie_buffer = chart_buffers.get("pie")
+bar_buffer = chart_buffers.get("bar")
+role_buffer = chart_buffers.get("role")
+
 # Generate the PDF report with the summary and charts
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 pdf_file_path = os.path.join(reports_folder, f"inactive_users_report_{timestamp}.pdf")
 logging.info("Generating PDF report")
-generate_pdf_report(pdf_file_path, summary_message, csv_file_path, pie_buffer, bar_buffer, role_buffer)
+pdf_generated = generate_pdf_report(pdf_file_path, summary_message, csv_file_path, pie_buffer, bar_buffer, role_buffer)
 
 logging.info("User Management Automation Completed!")
 
@@ -340,4 +546,15 @@ logging.info("User Management Automation Completed!")
 email_subject = "ArcGIS User Management Report Summary"
 summary_message_email = summary_message + "\n\nPDF report attached."
 logging.info("Sending summary email with PDF attachment")
-send_email(email_subject, summary_message_email, attachment_path=pdf_file_path)
+email_sent = send_email(email_subject, summary_message_email, attachment_path=pdf_file_path)
+
+# Remember the reported state so an identical run next time can be skipped, but only once the
+# report has actually gone out; after a failed PDF or email the next run tries again
+if pdf_generated and email_sent:
+	try:
+		with open(CONFIG["manifest_hash_file"], "w") as f:
+			f.write(manifest_hash)
+	except OSError as e:
+		logging.warning("Could not write report manifest hash: %s", e)
+else:
+	logging.warning("Report was not delivered; the user state will be reported again on the next run")